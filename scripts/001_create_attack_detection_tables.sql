@@ -103,7 +103,7 @@ CREATE TABLE IF NOT EXISTS ml_models (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
   model_name TEXT NOT NULL,
   version TEXT NOT NULL,
-  model_type TEXT NOT NULL, -- 'random_forest', 'xgboost', 'ensemble'
+  model_type TEXT NOT NULL, -- 'hist_gradient_boosting', 'xgboost', 'ensemble'
   accuracy DECIMAL(5,4),
   precision_score DECIMAL(5,4),
   recall_score DECIMAL(5,4),
@@ -0,0 +1,89 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled HTTP request parsing for the PCAP processor
+Mirrors _parse_http_request in pcap_processor.py byte for byte
+"""
+
+cdef tuple METHODS = (b'GET', b'POST', b'PUT', b'DELETE', b'HEAD',
+                      b'OPTIONS', b'PATCH', b'CONNECT', b'TRACE')
+
+cdef inline bint _is_space(unsigned char c):
+    return c == 32 or 9 <= c <= 13
+
+cdef inline unsigned char _lower(unsigned char c):
+    return c + 32 if 65 <= c <= 90 else c
+
+cdef Py_ssize_t _request_line(const unsigned char* p, Py_ssize_t n, Py_ssize_t* path_start, Py_ssize_t* path_end):
+    """Length of the method if the payload starts with a request line, else -1"""
+    cdef bytes method
+    cdef const unsigned char* m
+    cdef Py_ssize_t i, j, length = -1
+    
+    for method in METHODS:
+        m = method
+        j = len(method)
+        if j < n and p[j] == 32:
+            for i in range(j):
+                if p[i] != m[i]:
+                    break
+            else:
+                length = j
+                break
+    if length < 0:
+        return -1
+    
+    # (\S+) HTTP/\d\.\d
+    i = length + 1
+    j = i
+    while j < n and not _is_space(p[j]):
+        j += 1
+    if j == i or j + 9 > n:
+        return -1
+    if (p[j] != 32 or p[j + 1] != 72 or p[j + 2] != 84 or p[j + 3] != 84 or p[j + 4] != 80
+            or p[j + 5] != 47 or not 48 <= p[j + 6] <= 57 or p[j + 7] != 46 or not 48 <= p[j + 8] <= 57):
+        return -1
+    
+    path_start[0] = i
+    path_end[0] = j
+    return length
+
+cdef object _header(bytes payload, const unsigned char* p, Py_ssize_t end, const unsigned char* name, Py_ssize_t name_len):
+    """Value of the first \\r\\n<name>: header before end, right-stripped, or None"""
+    cdef Py_ssize_t i, k, start, stop
+    
+    for i in range(end - name_len - 2):
+        if p[i] != 13 or p[i + 1] != 10 or p[i + 2 + name_len] != 58:
+            continue
+        for k in range(name_len):
+            if _lower(p[i + 2 + k]) != name[k]:
+                break
+        else:
+            start = i + 3 + name_len
+            while start < end and (p[start] == 32 or p[start] == 9):
+                start += 1
+            stop = start
+            while stop < end and p[stop] != 13 and p[stop] != 10:
+                stop += 1
+            while stop > start and _is_space(p[stop - 1]):
+                stop -= 1
+            return payload[start:stop]
+    return None
+
+def parse_http_request(bytes payload):
+    """Split an HTTP request head into (method, path, host, user_agent, referer) bytes"""
+    cdef const unsigned char* p = payload
+    cdef Py_ssize_t n = len(payload)
+    cdef Py_ssize_t path_start = 0, path_end = 0
+    cdef Py_ssize_t method_len = _request_line(p, n, &path_start, &path_end)
+    if method_len < 0:
+        return None
+    
+    # Only search the header block, not the request body
+    cdef Py_ssize_t header_end = payload.find(b'\r\n\r\n')
+    if header_end < 0:
+        header_end = n
+    
+    return (payload[:method_len], payload[path_start:path_end],
+            _header(payload, p, header_end, b'host', 4),
+            _header(payload, p, header_end, b'user-agent', 10),
+            _header(payload, p, header_end, b'referer', 7))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Soft-voting ensemble for Cyber Attack Detection
+Combines already trained classifiers without refitting them
+"""
+
+import numpy as np
+from sklearn.ensemble import VotingClassifier
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import Bunch
+
+class SoftVoteEnsemble:
+    def __init__(self, estimators, weights=None):
+        self.estimators = estimators
+        self.weights = weights
+        self.classes_ = estimators[0][1].classes_
+    
+    def predict_proba(self, X):
+        """Weighted average of the member class probabilities"""
+        probabilities = [estimator.predict_proba(X) for _, estimator in self.estimators]
+        return np.average(probabilities, axis=0, weights=self.weights)
+    
+    def predict(self, X):
+        """Predict the class with the highest averaged probability"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+    
+    def to_voting_classifier(self):
+        """Equivalent fitted VotingClassifier, used for ONNX conversion"""
+        voting = VotingClassifier(
+            estimators=self.estimators,
+            voting='soft',
+            weights=self.weights,
+            flatten_transform=False
+        )
+        voting.estimators_ = [estimator for _, estimator in self.estimators]
+        voting.named_estimators_ = Bunch(**dict(self.estimators))
+        voting.le_ = LabelEncoder().fit(self.classes_)
+        voting.classes_ = voting.le_.classes_
+        
+        return voting
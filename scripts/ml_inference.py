@@ -4,52 +4,168 @@ ML Inference Script for Real-time Cyber Attack Detection
 Loads trained models and provides prediction capabilities
 """
 
+import functools
 import joblib
+from joblib import Parallel, delayed
 import json
+import math
+import re
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 import os
+import time
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Precompiled patterns for the pure-Python feature path
+_SPECIAL_CHAR_RE = re.compile(r'[!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>\/?]')
+_DIGIT_RE = re.compile(r'\d')
+_ENCODED_CHAR_RE = re.compile(r'%[0-9A-Fa-f]{2}')
+
+SUSPICIOUS_KEYWORDS = [
+    'admin', 'root', 'password', 'passwd', 'login', 'cmd', 'shell',
+    'union', 'select', 'insert', 'delete', 'drop', 'exec', 'script',
+    'alert', 'prompt', 'confirm', 'javascript', 'vbscript',
+    '../', '..\\', '/etc/', '/proc/', '/var/',
+    '|', '&', ';', '`', '$('
+]
+
+HIGH_RISK_ATTACKS = frozenset(['sqli', 'xss', 'command_injection', 'web_shell', 'xxe'])
+
+# Risk level by (is high-risk attack type, confidence bucket)
+RISK_LEVELS = {
+    True: ('medium', 'high', 'critical'),
+    False: ('low', 'medium', 'high')
+}
+
+# Byte lookup tables for the single-pass feature kernel
+_SPECIAL_LUT = np.zeros(256, dtype=np.bool_)
+_SPECIAL_LUT[np.frombuffer(b'!@#$%^&*()_+-=[]{};\':"\\|,.<>/?', dtype=np.uint8)] = True
+_HEX_LUT = np.zeros(256, dtype=np.bool_)
+_HEX_LUT[np.frombuffer(b'0123456789abcdefABCDEF', dtype=np.uint8)] = True
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _extract_counts(buf):
+        """Count digits, special chars and %XX escapes and compute entropy in one pass"""
+        n = buf.shape[0]
+        digit_count = 0
+        special_char_count = 0
+        encoded_chars_count = 0
+        histogram = np.zeros(256, dtype=np.int64)
+        
+        for i in range(n):
+            b = buf[i]
+            histogram[b] += 1
+            if 48 <= b <= 57:
+                digit_count += 1
+            if _SPECIAL_LUT[b]:
+                special_char_count += 1
+            if b == 37 and i + 2 < n and _HEX_LUT[buf[i + 1]] and _HEX_LUT[buf[i + 2]]:
+                encoded_chars_count += 1
+        
+        entropy = 0.0
+        for count in histogram:
+            if count > 0:
+                probability = count / n
+                entropy -= probability * math.log2(probability)
+        
+        return digit_count, special_char_count, encoded_chars_count, entropy
+
+# (epoch second, ISO string) of the last formatted timestamp
+_timestamp_cache = (0, '')
+
+def _timestamp() -> str:
+    """Current ISO timestamp at second resolution, formatted at most once per second"""
+    global _timestamp_cache
+    now = int(time.time())
+    if now != _timestamp_cache[0]:
+        _timestamp_cache = (now, datetime.fromtimestamp(now).isoformat())
+    return _timestamp_cache[1]
 
 class CyberAttackPredictor:
+    PREDICTION_CACHE_SIZE = 8192
+    BATCH_CHUNK_SIZE = 256
+    
     def __init__(self, model_version: str = "1.0.0"):
         self.model_version = model_version
         self.models = {}
+        self.ort_sessions = {}
         self.scaler = None
         self.label_encoder = None
+        self._class_names = []
         self.metadata = None
         self.feature_columns = []
         self.attack_types = []
         
         self.load_models()
+        
+        # Column positions for filling a predict() feature row
+        self._col_index = {col: i for i, col in enumerate(self.feature_columns)}
+        
+        # Single-pass matcher for all suspicious keywords
+        self._kw_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._kw_automaton = ahocorasick.Automaton()
+            for keyword in SUSPICIOUS_KEYWORDS:
+                self._kw_automaton.add_word(keyword, keyword)
+            self._kw_automaton.make_automaton()
+        
+        # Per-instance LRU cache of prediction results keyed on (url, model_type)
+        self._predict_core = functools.lru_cache(maxsize=self.PREDICTION_CACHE_SIZE)(self._predict_uncached)
+        
+        # Trigger JIT compilation (or cache load) before the first real request
+        if NUMBA_AVAILABLE:
+            _extract_counts(np.zeros(1, dtype=np.uint8))
     
     def load_models(self):
         """Load trained models and preprocessors"""
         models_dir = "models"
         
         try:
-            # Load metadata
-            metadata_path = f"{models_dir}/metadata_v{self.model_version}.json"
-            with open(metadata_path, 'r') as f:
-                self.metadata = json.load(f)
+            bundle_path = f"{models_dir}/bundle_v{self.model_version}.pkl"
+            if os.path.exists(bundle_path):
+                # Single bundle file; numpy arrays are memory-mapped read-only
+                bundle = joblib.load(bundle_path, mmap_mode='r')
+                self.metadata = bundle['metadata']
+                self.models = bundle['models']
+                self.scaler = bundle['scaler']
+                self.label_encoder = bundle['label_encoder']
+                print(f"Loaded {', '.join(self.models)} models from {bundle_path}")
+            else:
+                self._load_separate_files(models_dir)
             
             self.feature_columns = self.metadata['feature_columns']
             self.attack_types = self.metadata['attack_types']
+            self._class_names = [str(name) for name in self.label_encoder.classes_]
             
-            # Load models
+            # Prefer the ONNX export for inference when present
             for model_type in self.metadata['model_types']:
-                model_path = f"{models_dir}/{model_type}_v{self.model_version}.pkl"
-                if os.path.exists(model_path):
-                    self.models[model_type] = joblib.load(model_path)
-                    print(f"Loaded {model_type} model")
-            
-            # Load preprocessors
-            scaler_path = f"{models_dir}/scaler_v{self.model_version}.pkl"
-            self.scaler = joblib.load(scaler_path)
-            
-            encoder_path = f"{models_dir}/label_encoder_v{self.model_version}.pkl"
-            self.label_encoder = joblib.load(encoder_path)
+                onnx_path = f"{models_dir}/{model_type}_v{self.model_version}.onnx"
+                if ONNXRUNTIME_AVAILABLE and os.path.exists(onnx_path):
+                    self.ort_sessions[model_type] = ort.InferenceSession(
+                        onnx_path, providers=['CPUExecutionProvider']
+                    )
+                    print(f"Loaded {model_type} ONNX session")
             
             print(f"Successfully loaded models version {self.model_version}")
             
@@ -57,36 +173,62 @@ class CyberAttackPredictor:
             print(f"Error loading models: {e}")
             raise
     
+    def _load_separate_files(self, models_dir: str):
+        """Load metadata, models and preprocessors from individual files"""
+        # Load metadata
+        metadata_path = f"{models_dir}/metadata_v{self.model_version}.json"
+        with open(metadata_path, 'r') as f:
+            self.metadata = json.load(f)
+        
+        # Load models
+        for model_type in self.metadata['model_types']:
+            model_path = f"{models_dir}/{model_type}_v{self.model_version}.pkl"
+            if os.path.exists(model_path):
+                self.models[model_type] = joblib.load(model_path)
+                print(f"Loaded {model_type} model")
+        
+        # Load preprocessors
+        scaler_path = f"{models_dir}/scaler_v{self.model_version}.pkl"
+        self.scaler = joblib.load(scaler_path)
+        
+        encoder_path = f"{models_dir}/label_encoder_v{self.model_version}.pkl"
+        self.label_encoder = joblib.load(encoder_path)
+    
     def extract_features(self, url: str, additional_features: Optional[Dict] = None) -> Dict:
         """Extract features from URL for prediction"""
         try:
-            from urllib.parse import urlparse, parse_qs
-            import re
-            import math
-            
             parsed = urlparse(url)
             domain = parsed.netloc
             path = parsed.path
             query = parsed.query
             
+            # Character-level counters
+            if NUMBA_AVAILABLE:
+                buf = np.frombuffer(url.encode('utf-8'), dtype=np.uint8)
+                digit_count, special_char_count, encoded_chars_count, entropy = _extract_counts(buf)
+            else:
+                special_char_count = len(_SPECIAL_CHAR_RE.findall(url))
+                digit_count = len(_DIGIT_RE.findall(url))
+                encoded_chars_count = len(_ENCODED_CHAR_RE.findall(url))
+                entropy = self._calculate_entropy(url)
+            
             # Basic features
             features = {
                 'url_length': len(url),
                 'domain_length': len(domain),
                 'path_length': len(path),
                 'query_length': len(query),
-                'special_char_count': len(re.findall(r'[!@#$%^&*()_+\-=\[\]{};\':"\\|,.<>\/?]', url)),
-                'digit_count': len(re.findall(r'\d', url)),
+                'special_char_count': special_char_count,
+                'digit_count': digit_count,
                 'path_depth': len([p for p in path.split('/') if p]),
                 'subdomain_count': max(0, len(domain.split('.')) - 2),
                 'parameter_count': len(parse_qs(query)),
-                'encoded_chars_count': len(re.findall(r'%[0-9A-Fa-f]{2}', url)),
+                'encoded_chars_count': encoded_chars_count,
                 'frequency_score': self._calculate_frequency_score(url),
                 'suspicious_keyword_count': self._count_suspicious_keywords(url)
             }
             
-            # Calculate entropy
-            features['entropy'] = self._calculate_entropy(url)
+            features['entropy'] = float(entropy)
             
             # Add additional features if provided
             if additional_features:
@@ -104,20 +246,12 @@ class CyberAttackPredictor:
         if not text:
             return 0.0
         
-        # Count character frequencies
-        char_counts = {}
-        for char in text:
-            char_counts[char] = char_counts.get(char, 0) + 1
-        
-        # Calculate entropy
-        entropy = 0.0
-        text_length = len(text)
-        
-        for count in char_counts.values():
-            probability = count / text_length
-            entropy -= probability * math.log2(probability)
+        # Count byte frequencies and compute entropy vectorized
+        buf = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+        counts = np.bincount(buf, minlength=256)
+        probabilities = counts[counts > 0] / buf.size
         
-        return entropy
+        return float((probabilities * np.log2(1.0 / probabilities)).sum())
     
     def _calculate_frequency_score(self, url: str) -> float:
         """Calculate frequency score based on common patterns"""
@@ -131,19 +265,15 @@ class CyberAttackPredictor:
         return min(score, 1.0)
     
     def _count_suspicious_keywords(self, url: str) -> int:
-        """Count suspicious keywords in URL"""
-        suspicious_keywords = [
-            'admin', 'root', 'password', 'passwd', 'login', 'cmd', 'shell',
-            'union', 'select', 'insert', 'delete', 'drop', 'exec', 'script',
-            'alert', 'prompt', 'confirm', 'javascript', 'vbscript',
-            '../', '..\\', '/etc/', '/proc/', '/var/',
-            '|', '&', ';', '`', '$('
-        ]
-        
+        """Count distinct suspicious keywords in URL"""
         url_lower = url.lower()
+        
+        if self._kw_automaton is not None:
+            return len({keyword for _, keyword in self._kw_automaton.iter(url_lower)})
+        
         count = 0
         
-        for keyword in suspicious_keywords:
+        for keyword in SUSPICIOUS_KEYWORDS:
             if keyword in url_lower:
                 count += 1
         
@@ -152,56 +282,25 @@ class CyberAttackPredictor:
     def predict(self, url: str, model_type: str = 'ensemble') -> Dict:
         """Predict attack type and confidence for a URL"""
         try:
-            start_time = datetime.now()
-            
-            # Extract features
-            features = self.extract_features(url)
+            start_ns = time.perf_counter_ns()
             
-            # Prepare feature vector
-            feature_vector = []
-            for col in self.feature_columns:
-                feature_vector.append(features.get(col, 0))
-            
-            # Scale features
-            feature_vector = np.array(feature_vector).reshape(1, -1)
-            feature_vector_scaled = self.scaler.transform(feature_vector)
-            
-            # Get model
-            if model_type not in self.models:
-                model_type = 'ensemble'  # Fallback to ensemble
+            # Repeated URLs are served from the prediction cache
+            attack_type, confidence, risk_level, probabilities, features, model_type = \
+                self._predict_core(url, model_type)
             
-            model = self.models[model_type]
-            
-            # Make prediction
-            prediction = model.predict(feature_vector_scaled)[0]
-            probabilities = model.predict_proba(feature_vector_scaled)[0]
-            
-            # Convert prediction back to attack type
-            attack_type = self.label_encoder.inverse_transform([prediction])[0]
-            confidence = float(np.max(probabilities))
-            
-            # Get all probabilities
-            all_probabilities = {}
-            for i, prob in enumerate(probabilities):
-                attack_name = self.label_encoder.inverse_transform([i])[0]
-                all_probabilities[attack_name] = float(prob)
-            
-            # Determine risk level
-            risk_level = self._determine_risk_level(attack_type, confidence)
-            
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1e6
             
             result = {
                 'url': url,
                 'predicted_attack_type': attack_type,
                 'confidence': confidence,
                 'risk_level': risk_level,
-                'all_probabilities': all_probabilities,
-                'features': features,
+                'all_probabilities': dict(probabilities),
+                'features': dict(features),
                 'model_used': model_type,
                 'model_version': self.model_version,
                 'processing_time_ms': processing_time,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _timestamp()
             }
             
             return result
@@ -211,39 +310,138 @@ class CyberAttackPredictor:
             return {
                 'url': url,
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _timestamp()
             }
     
+    def _predict_uncached(self, url: str, model_type: str) -> Tuple:
+        """Run the full feature/scale/predict pipeline, returning a hashable result tuple"""
+        # Extract features
+        features = self.extract_features(url)
+        
+        # Prepare feature vector in a row owned by this call, so concurrent predictions don't share it
+        feature_vector = np.empty((1, len(self._col_index)), dtype=np.float32)
+        row = feature_vector[0]
+        for col, i in self._col_index.items():
+            row[i] = features.get(col, 0)
+        
+        # Scale features in place
+        feature_vector_scaled = self.scaler.transform(feature_vector, copy=False)
+        
+        # Get model
+        if model_type not in self.models:
+            model_type = 'ensemble'  # Fallback to ensemble
+        
+        # Make prediction
+        probabilities = self._predict_proba(model_type, feature_vector_scaled)[0]
+        prediction = int(np.argmax(probabilities))
+        
+        # Convert prediction back to attack type
+        attack_type = self._class_names[prediction]
+        confidence = float(np.max(probabilities))
+        
+        # Get all probabilities
+        all_probabilities = tuple(zip(self._class_names, probabilities.tolist()))
+        
+        # Determine risk level
+        risk_level = self._determine_risk_level(attack_type, confidence)
+        
+        return (
+            attack_type,
+            confidence,
+            risk_level,
+            all_probabilities,
+            tuple(features.items()),
+            model_type
+        )
+    
+    def _predict_proba(self, model_type: str, X_scaled: np.ndarray) -> np.ndarray:
+        """Class probabilities from the ONNX session if loaded, else the sklearn model"""
+        session = self.ort_sessions.get(model_type)
+        if session is not None:
+            return session.run(None, {'input': X_scaled.astype(np.float32, copy=False)})[1]
+        
+        return self.models[model_type].predict_proba(X_scaled)
+    
     def _determine_risk_level(self, attack_type: str, confidence: float) -> str:
         """Determine risk level based on attack type and confidence"""
         if attack_type == 'benign':
             return 'low'
         
-        # High-risk attack types
-        high_risk_attacks = ['sqli', 'xss', 'command_injection', 'web_shell', 'xxe']
-        
-        if attack_type in high_risk_attacks:
-            if confidence >= 0.9:
-                return 'critical'
-            elif confidence >= 0.7:
-                return 'high'
-            else:
-                return 'medium'
-        else:
-            if confidence >= 0.9:
-                return 'high'
-            elif confidence >= 0.7:
-                return 'medium'
-            else:
-                return 'low'
+        # Index 0: confidence < 0.7, 1: < 0.9, 2: >= 0.9
+        bucket = (confidence >= 0.7) + (confidence >= 0.9)
+        return RISK_LEVELS[attack_type in HIGH_RISK_ATTACKS][bucket]
     
     def batch_predict(self, urls: List[str], model_type: str = 'ensemble') -> List[Dict]:
         """Predict attack types for multiple URLs"""
-        results = []
+        if not urls:
+            return []
         
-        for url in urls:
-            result = self.predict(url, model_type)
-            results.append(result)
+        try:
+            start_ns = time.perf_counter_ns()
+            
+            # Get model
+            if model_type not in self.models:
+                model_type = 'ensemble'  # Fallback to ensemble
+            
+            # Large batches are split into chunks predicted on worker threads;
+            # numba, sklearn tree code and onnxruntime release the GIL
+            chunk_size = self.BATCH_CHUNK_SIZE
+            if len(urls) <= chunk_size:
+                results = self._batch_core(urls, model_type)
+            else:
+                chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+                chunk_results = Parallel(n_jobs=-1, backend='threading')(
+                    delayed(self._batch_core)(chunk, model_type) for chunk in chunks
+                )
+                results = [result for chunk in chunk_results for result in chunk]
+            
+            # Report the amortized per-URL processing time
+            processing_time = (time.perf_counter_ns() - start_ns) / 1e6 / len(urls)
+            timestamp = _timestamp()
+            for result in results:
+                result['processing_time_ms'] = processing_time
+                result['timestamp'] = timestamp
+            
+            return results
+            
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            timestamp = _timestamp()
+            return [{'url': url, 'error': str(e), 'timestamp': timestamp} for url in urls]
+    
+    def _batch_core(self, urls: List[str], model_type: str) -> List[Dict]:
+        """Vectorized feature extraction and prediction for one chunk of URLs"""
+        # Build the (n_urls, n_features) matrix in one buffer
+        X = np.empty((len(urls), len(self.feature_columns)), dtype=np.float32)
+        all_features = []
+        for i, url in enumerate(urls):
+            features = self.extract_features(url)
+            all_features.append(features)
+            X[i] = [features.get(col, 0) for col in self.feature_columns]
+        
+        # Scale and predict the whole chunk at once
+        X_scaled = self.scaler.transform(X)
+        probabilities = self._predict_proba(model_type, X_scaled)
+        predictions = probabilities.argmax(axis=1)
+        
+        attack_names = [self._class_names[i] for i in predictions]
+        confidences = probabilities.max(axis=1)
+        
+        results = []
+        for url, features, attack_type, confidence, probs in zip(
+            urls, all_features, attack_names, confidences, probabilities
+        ):
+            confidence = float(confidence)
+            results.append({
+                'url': url,
+                'predicted_attack_type': attack_type,
+                'confidence': confidence,
+                'risk_level': self._determine_risk_level(attack_type, confidence),
+                'all_probabilities': dict(zip(self._class_names, probs.tolist())),
+                'features': features,
+                'model_used': model_type,
+                'model_version': self.model_version
+            })
         
         return results
     
@@ -252,6 +450,7 @@ class CyberAttackPredictor:
         return {
             'version': self.model_version,
             'available_models': list(self.models.keys()),
+            'onnx_models': list(self.ort_sessions.keys()),
             'feature_columns': self.feature_columns,
             'attack_types': self.attack_types,
             'metadata': self.metadata
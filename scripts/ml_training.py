@@ -1,23 +1,42 @@
 #!/usr/bin/env python3
 """
 ML Training Script for Cyber Attack Detection
-Trains ensemble models (Random Forest + XGBoost) for URL-based attack detection
+Trains ensemble models (HistGradientBoosting + XGBoost) for URL-based attack detection
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.experimental import enable_halving_search_cv
+from sklearn.model_selection import train_test_split, cross_val_score, HalvingGridSearchCV
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, f1_score
 import xgboost as xgb
 import joblib
 import json
 import os
+import copy
 from datetime import datetime
+from ml_ensemble import SoftVoteEnsemble
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from skl2onnx import convert_sklearn, update_registered_converter
+    from skl2onnx.common.data_types import FloatTensorType
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+    
+    # Let skl2onnx convert XGBoost estimators, including inside the ensemble
+    update_registered_converter(
+        xgb.XGBClassifier, 'XGBoostXGBClassifier',
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={'nocl': [True, False], 'zipmap': [True, False, 'columns']}
+    )
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
 class CyberAttackMLTrainer:
     def __init__(self):
         self.models = {}
@@ -34,8 +53,7 @@ class CyberAttackMLTrainer:
         """Generate synthetic training data for demonstration"""
         print(f"Generating {n_samples} synthetic training samples...")
         
-        np.random.seed(42)
-        data = []
+        rng = np.random.default_rng(42)
         
         # Attack type mapping
         attack_types = [
@@ -44,86 +62,93 @@ class CyberAttackMLTrainer:
             'http_parameter_pollution', 'xxe', 'web_shell', 'typosquatting'
         ]
         
-        for i in range(n_samples):
-            # Randomly select attack type (80% attacks, 20% benign)
-            is_attack = np.random.random() < 0.8
-            
-            if is_attack:
-                attack_type = np.random.choice(attack_types)
-                # Generate features based on attack type
-                features = self._generate_attack_features(attack_type)
-            else:
-                attack_type = 'benign'
-                features = self._generate_benign_features()
-            
-            features['attack_type'] = attack_type
-            data.append(features)
+        # Randomly select attack type (80% attacks, 20% benign)
+        is_attack = rng.random(n_samples) < 0.8
+        labels = np.where(is_attack, rng.choice(attack_types, n_samples), 'benign')
+        
+        # Draw every feature for all samples of a class at once
+        attack_features = self._generate_attack_features(labels[is_attack], rng)
+        benign_features = self._generate_benign_features(int((~is_attack).sum()), rng)
         
-        return pd.DataFrame(data)
+        # Column-wise float32 arrays, handed to pandas without a copy
+        data = {}
+        for col in self.feature_columns:
+            column = np.empty(n_samples, dtype=np.float32)
+            column[is_attack] = attack_features[col]
+            column[~is_attack] = benign_features[col]
+            data[col] = column
+        data['attack_type'] = labels
+        
+        return pd.DataFrame(data, copy=False)
     
-    def _generate_attack_features(self, attack_type):
-        """Generate features for specific attack types"""
+    def _generate_attack_features(self, attack_types, rng):
+        """Generate features for an array of attack type labels"""
+        n = len(attack_types)
         base_features = {
-            'url_length': np.random.normal(150, 50),
-            'domain_length': np.random.normal(15, 5),
-            'path_length': np.random.normal(30, 15),
-            'query_length': np.random.normal(50, 25),
-            'special_char_count': np.random.poisson(8),
-            'digit_count': np.random.poisson(5),
-            'entropy': np.random.normal(4.5, 0.8),
-            'path_depth': np.random.poisson(3),
-            'subdomain_count': np.random.poisson(1),
-            'parameter_count': np.random.poisson(3),
-            'encoded_chars_count': np.random.poisson(2),
-            'frequency_score': np.random.beta(2, 5),
-            'suspicious_keyword_count': np.random.poisson(2)
+            'url_length': rng.normal(150, 50, n),
+            'domain_length': rng.normal(15, 5, n),
+            'path_length': rng.normal(30, 15, n),
+            'query_length': rng.normal(50, 25, n),
+            'special_char_count': rng.poisson(8, n),
+            'digit_count': rng.poisson(5, n),
+            'entropy': rng.normal(4.5, 0.8, n),
+            'path_depth': rng.poisson(3, n),
+            'subdomain_count': rng.poisson(1, n),
+            'parameter_count': rng.poisson(3, n),
+            'encoded_chars_count': rng.poisson(2, n),
+            'frequency_score': rng.beta(2, 5, n),
+            'suspicious_keyword_count': rng.poisson(2, n)
         }
         
         # Modify features based on attack type
-        if attack_type == 'sqli':
-            base_features['special_char_count'] += np.random.poisson(5)
-            base_features['suspicious_keyword_count'] += np.random.poisson(3)
-            base_features['query_length'] += np.random.normal(30, 10)
-            
-        elif attack_type == 'xss':
-            base_features['special_char_count'] += np.random.poisson(8)
-            base_features['suspicious_keyword_count'] += np.random.poisson(2)
-            base_features['encoded_chars_count'] += np.random.poisson(3)
-            
-        elif attack_type == 'directory_traversal':
-            base_features['path_length'] += np.random.normal(40, 15)
-            base_features['path_depth'] += np.random.poisson(2)
-            base_features['suspicious_keyword_count'] += np.random.poisson(1)
-            
-        elif attack_type == 'command_injection':
-            base_features['special_char_count'] += np.random.poisson(6)
-            base_features['suspicious_keyword_count'] += np.random.poisson(2)
-            
+        mask = attack_types == 'sqli'
+        k = int(mask.sum())
+        base_features['special_char_count'][mask] += rng.poisson(5, k)
+        base_features['suspicious_keyword_count'][mask] += rng.poisson(3, k)
+        base_features['query_length'][mask] += rng.normal(30, 10, k)
+        
+        mask = attack_types == 'xss'
+        k = int(mask.sum())
+        base_features['special_char_count'][mask] += rng.poisson(8, k)
+        base_features['suspicious_keyword_count'][mask] += rng.poisson(2, k)
+        base_features['encoded_chars_count'][mask] += rng.poisson(3, k)
+        
+        mask = attack_types == 'directory_traversal'
+        k = int(mask.sum())
+        base_features['path_length'][mask] += rng.normal(40, 15, k)
+        base_features['path_depth'][mask] += rng.poisson(2, k)
+        base_features['suspicious_keyword_count'][mask] += rng.poisson(1, k)
+        
+        mask = attack_types == 'command_injection'
+        k = int(mask.sum())
+        base_features['special_char_count'][mask] += rng.poisson(6, k)
+        base_features['suspicious_keyword_count'][mask] += rng.poisson(2, k)
+        
         # Ensure positive values
         for key in base_features:
             if key != 'frequency_score':
-                base_features[key] = max(0, base_features[key])
+                base_features[key] = np.maximum(0, base_features[key])
             else:
-                base_features[key] = max(0, min(1, base_features[key]))
+                base_features[key] = np.clip(base_features[key], 0, 1)
         
         return base_features
     
-    def _generate_benign_features(self):
-        """Generate features for benign URLs"""
+    def _generate_benign_features(self, n, rng):
+        """Generate features for n benign URLs"""
         return {
-            'url_length': np.random.normal(80, 20),
-            'domain_length': np.random.normal(12, 3),
-            'path_length': np.random.normal(20, 8),
-            'query_length': np.random.normal(15, 10),
-            'special_char_count': np.random.poisson(2),
-            'digit_count': np.random.poisson(3),
-            'entropy': np.random.normal(3.8, 0.5),
-            'path_depth': np.random.poisson(2),
-            'subdomain_count': np.random.poisson(0),
-            'parameter_count': np.random.poisson(1),
-            'encoded_chars_count': np.random.poisson(0),
-            'frequency_score': np.random.beta(5, 2),
-            'suspicious_keyword_count': 0
+            'url_length': rng.normal(80, 20, n),
+            'domain_length': rng.normal(12, 3, n),
+            'path_length': rng.normal(20, 8, n),
+            'query_length': rng.normal(15, 10, n),
+            'special_char_count': rng.poisson(2, n),
+            'digit_count': rng.poisson(3, n),
+            'entropy': rng.normal(3.8, 0.5, n),
+            'path_depth': rng.poisson(2, n),
+            'subdomain_count': rng.poisson(0, n),
+            'parameter_count': rng.poisson(1, n),
+            'encoded_chars_count': rng.poisson(0, n),
+            'frequency_score': rng.beta(5, 2, n),
+            'suspicious_keyword_count': np.zeros(n)
         }
     
     def prepare_data(self, df):
@@ -148,24 +173,31 @@ class CyberAttackMLTrainer:
         
         return X_scaled, y_encoded, y
     
-    def train_random_forest(self, X, y):
-        """Train Random Forest model"""
-        print("Training Random Forest model...")
+    def train_hist_gradient_boosting(self, X, y):
+        """Train HistGradientBoosting model"""
+        print("Training HistGradientBoosting model...")
         
         # Hyperparameter tuning
         param_grid = {
-            'n_estimators': [100, 200, 300],
-            'max_depth': [10, 20, None],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4]
+            'learning_rate': [0.05, 0.1, 0.2],
+            'max_leaf_nodes': [15, 31, 63],
+            'l2_regularization': [0.0, 1.0]
         }
         
-        rf = RandomForestClassifier(random_state=42, n_jobs=-1)
-        grid_search = GridSearchCV(rf, param_grid, cv=3, scoring='f1_weighted', n_jobs=-1)
+        # Successive halving: candidates are scored on growing sample budgets
+        # and only the best third advances each round
+        hgb = HistGradientBoostingClassifier(
+            max_iter=300, learning_rate=0.1, max_depth=None,
+            early_stopping=True, random_state=42
+        )
+        grid_search = HalvingGridSearchCV(
+            hgb, param_grid, cv=3, scoring='f1_weighted', n_jobs=-1,
+            factor=3, resource='n_samples', random_state=42
+        )
         grid_search.fit(X, y)
         
-        self.models['random_forest'] = grid_search.best_estimator_
-        print(f"Best RF parameters: {grid_search.best_params_}")
+        self.models['hist_gradient_boosting'] = grid_search.best_estimator_
+        print(f"Best HGB parameters: {grid_search.best_params_}")
         
         return grid_search.best_estimator_
     
@@ -175,36 +207,89 @@ class CyberAttackMLTrainer:
         
         # Hyperparameter tuning
         param_grid = {
-            'n_estimators': [100, 200, 300],
             'max_depth': [6, 8, 10],
             'learning_rate': [0.01, 0.1, 0.2],
             'subsample': [0.8, 0.9, 1.0]
         }
         
-        xgb_model = xgb.XGBClassifier(random_state=42, n_jobs=-1)
-        grid_search = GridSearchCV(xgb_model, param_grid, cv=3, scoring='f1_weighted', n_jobs=-1)
+        device = self._xgboost_device()
+        print(f"XGBoost device: {device}")
+        
+        # Successive halving on boosting rounds: early rounds fit few trees,
+        # survivors are refit with up to 300
+        xgb_model = xgb.XGBClassifier(tree_method='hist', device=device, random_state=42, n_jobs=-1)
+        grid_search = HalvingGridSearchCV(
+            xgb_model, param_grid, cv=3, scoring='f1_weighted',
+            n_jobs=1 if device == 'cuda' else -1,  # GPU fits run one at a time
+            factor=3, resource='n_estimators', max_resources=300
+        )
         grid_search.fit(X, y)
         
+        # Inference runs on CPU feature vectors
+        grid_search.best_estimator_.set_params(device='cpu')
+        
         self.models['xgboost'] = grid_search.best_estimator_
         print(f"Best XGB parameters: {grid_search.best_params_}")
         
         return grid_search.best_estimator_
     
-    def create_ensemble(self, X, y):
-        """Create ensemble model"""
-        print("Creating ensemble model...")
+    def _xgboost_device(self):
+        """Return 'cuda' if XGBoost can train on a visible GPU, otherwise 'cpu'"""
+        if not xgb.build_info().get('USE_CUDA'):
+            return 'cpu'
+        
+        try:
+            # XGBoost silently falls back to CPU without a GPU, so check
+            # which device a one-round probe actually ran on
+            probe = xgb.train(
+                {'device': 'cuda', 'tree_method': 'hist'},
+                xgb.DMatrix(np.zeros((2, 1)), label=[0, 1]),
+                num_boost_round=1
+            )
+            config = json.loads(probe.save_config())
+            device = config['learner']['generic_param']['device']
+            return 'cuda' if device.startswith('cuda') else 'cpu'
+        except xgb.core.XGBoostError:
+            return 'cpu'
+    
+    def prune_xgboost(self, X_val, y_val, tolerance=0.005):
+        """Truncate XGBoost to the fewest boosting rounds within tolerance of peak validation F1"""
+        model = self.models['xgboost']
+        booster = model.get_booster()
+        n_rounds = booster.num_boosted_rounds()
+        
+        # Score staged predictions without refitting
+        candidates = [k for k in (50, 100, 150, 200, 250) if k < n_rounds] + [n_rounds]
+        scores = {
+            k: f1_score(y_val, model.predict(X_val, iteration_range=(0, k)), average='weighted')
+            for k in candidates
+        }
+        best_score = max(scores.values())
+        n_keep = min(k for k, score in scores.items() if score >= best_score - tolerance)
         
-        from sklearn.ensemble import VotingClassifier
+        print(f"XGBoost rounds: kept {n_keep} of {n_rounds} "
+              f"(F1 {scores[n_keep]:.4f} vs best {best_score:.4f})")
         
-        ensemble = VotingClassifier(
+        if n_keep < n_rounds:
+            pruned = xgb.XGBClassifier(**model.get_params())
+            pruned.load_model(bytearray(booster[:n_keep].save_raw('ubj')))
+            pruned.set_params(n_estimators=n_keep)
+            self.models['xgboost'] = pruned
+        
+        return self.models['xgboost']
+    
+    def create_ensemble(self):
+        """Create ensemble model from the already trained models"""
+        print("Creating ensemble model...")
+        
+        # Soft voting over the fitted models; no second training pass
+        ensemble = SoftVoteEnsemble(
             estimators=[
-                ('rf', self.models['random_forest']),
+                ('hgb', self.models['hist_gradient_boosting']),
                 ('xgb', self.models['xgboost'])
-            ],
-            voting='soft'
+            ]
         )
         
-        ensemble.fit(X, y)
         self.models['ensemble'] = ensemble
         
         return ensemble
@@ -214,33 +299,55 @@ class CyberAttackMLTrainer:
         print("\nEvaluating models...")
         
         results = {}
+        class_names = self.label_encoders['attack_type'].classes_
         
         for model_name, model in self.models.items():
             print(f"\n{model_name.upper()} Results:")
             
             # Predictions
             y_pred = model.predict(X_test)
-            y_pred_proba = model.predict_proba(X_test)
             
             # Metrics
             accuracy = accuracy_score(y_test, y_pred)
             
-            # Convert back to original labels for classification report
-            y_test_labels = self.label_encoders['attack_type'].inverse_transform(y_test)
-            y_pred_labels = self.label_encoders['attack_type'].inverse_transform(y_pred)
-            
             print(f"Accuracy: {accuracy:.4f}")
             print("\nClassification Report:")
-            print(classification_report(y_test_labels, y_pred_labels))
+            print(classification_report(
+                y_test, y_pred,
+                labels=np.arange(len(class_names)),
+                target_names=class_names,
+                digits=4
+            ))
             
             results[model_name] = {
                 'accuracy': accuracy,
-                'predictions': y_pred,
-                'probabilities': y_pred_proba
+                'predictions': y_pred
             }
         
         return results
     
+    def export_onnx(self, model, onnx_path):
+        """Export a trained model to ONNX for onnxruntime inference"""
+        # Work on a copy: the ONNX converters need positional XGBoost feature
+        # names, and the ensemble is exported as the equivalent VotingClassifier
+        model = copy.deepcopy(model)
+        if isinstance(model, SoftVoteEnsemble):
+            model = model.to_voting_classifier()
+        for estimator in [model] + list(getattr(model, 'estimators_', [])):
+            if isinstance(estimator, xgb.XGBClassifier):
+                estimator.get_booster().feature_names = None
+        
+        initial_types = [('input', FloatTensorType([None, len(self.feature_columns)]))]
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=initial_types,
+            options={id(model): {'zipmap': False}},
+            target_opset={'': 15, 'ai.onnx.ml': 3}
+        )
+        
+        with open(onnx_path, 'wb') as f:
+            f.write(onnx_model.SerializeToString())
+    
     def save_models(self, model_version="1.0.0"):
         """Save trained models and preprocessors"""
         print(f"\nSaving models (version {model_version})...")
@@ -254,10 +361,23 @@ class CyberAttackMLTrainer:
             model_path = f"{models_dir}/{model_name}_v{model_version}.pkl"
             joblib.dump(model, model_path)
             print(f"Saved {model_name} to {model_path}")
+            
+            if ONNX_AVAILABLE:
+                onnx_path = f"{models_dir}/{model_name}_v{model_version}.onnx"
+                try:
+                    self.export_onnx(model, onnx_path)
+                    print(f"Exported {model_name} to {onnx_path}")
+                except Exception as e:
+                    print(f"Could not export {model_name} to ONNX: {e}")
         
         # Save preprocessors
+        # Store scaler statistics as float32 to match the float32 inference path
+        scaler = copy.copy(self.scalers['features'])
+        for attr in ('mean_', 'scale_', 'var_'):
+            setattr(scaler, attr, getattr(scaler, attr).astype(np.float32))
+        
         scaler_path = f"{models_dir}/scaler_v{model_version}.pkl"
-        joblib.dump(self.scalers['features'], scaler_path)
+        joblib.dump(scaler, scaler_path)
         
         encoder_path = f"{models_dir}/label_encoder_v{model_version}.pkl"
         joblib.dump(self.label_encoders['attack_type'], encoder_path)
@@ -277,6 +397,19 @@ class CyberAttackMLTrainer:
         
         print(f"Saved metadata to {metadata_path}")
         
+        # Save everything the predictor needs as one uncompressed bundle so it
+        # loads with a single file open and can be memory-mapped
+        bundle = {
+            'metadata': metadata,
+            'models': self.models,
+            'scaler': scaler,
+            'label_encoder': self.label_encoders['attack_type']
+        }
+        bundle_path = f"{models_dir}/bundle_v{model_version}.pkl"
+        joblib.dump(bundle, bundle_path)
+        
+        print(f"Saved model bundle to {bundle_path}")
+        
         return models_dir
 
 def main():
@@ -299,13 +432,20 @@ def main():
         X, y, test_size=0.2, random_state=42, stratify=y
     )
     
+    # Hold out a validation slice of the training set for pruning
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train, y_train, test_size=0.1, random_state=42, stratify=y_train
+    )
+    
     print(f"\nTraining set size: {X_train.shape[0]}")
+    print(f"Validation set size: {X_val.shape[0]}")
     print(f"Test set size: {X_test.shape[0]}")
     
     # Train models
-    trainer.train_random_forest(X_train, y_train)
+    trainer.train_hist_gradient_boosting(X_train, y_train)
     trainer.train_xgboost(X_train, y_train)
-    trainer.create_ensemble(X_train, y_train)
+    trainer.prune_xgboost(X_val, y_val)
+    trainer.create_ensemble()
     
     # Evaluate models
     results = trainer.evaluate_models(X_test, y_test, y_original)
@@ -5,9 +5,19 @@ Extracts HTTP URLs from PCAP files and processes them for analysis
 """
 
 import os
+import io
+import re
+import array
+import mmap
+import shutil
+import socket
+import struct
 import sys
 import json
+import functools
 import asyncio
+import bisect
+import multiprocessing
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 import logging
@@ -22,34 +32,478 @@ except ImportError:
     SCAPY_AVAILABLE = False
     print("Warning: Scapy not available. Install with: pip install scapy")
 
+try:
+    import dpkt
+    DPKT_AVAILABLE = True
+except ImportError:
+    DPKT_AVAILABLE = False
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import liburing
+    LIBURING_AVAILABLE = True
+except ImportError:
+    LIBURING_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Ports whose TCP payload is parsed as HTTP (same as scapy's HTTP bindings)
+HTTP_PORTS = (80, 8080)
+
+# URL scheme by destination port, stored as a tag indexing PROTOCOLS and _URL_PREFIXES
+_PROTO = {80: 0, 8080: 0, 443: 1, 8443: 1}
+PROTOCOLS = ('http', 'https')
+_URL_PREFIXES = (b'http://', b'https://')
+
+# Start method for range workers; fork is unsafe once _amain has started threads
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# BPF filter passed to tcpdump on the scapy path
+BPF_FILTER = ' or '.join(f'tcp dst port {port}' for port in HTTP_PORTS)
+
+# HTTP request parsing on raw payload bytes
+_REQLINE_RE = re.compile(rb'^(GET|POST|PUT|DELETE|HEAD|OPTIONS|PATCH|CONNECT|TRACE) (\S+) HTTP/\d\.\d')
+_HOST_RE = re.compile(rb'\r\nHost:[ \t]*([^\r\n]*)', re.I)
+_USER_AGENT_RE = re.compile(rb'\r\nUser-Agent:[ \t]*([^\r\n]*)', re.I)
+_REFERER_RE = re.compile(rb'\r\nReferer:[ \t]*([^\r\n]*)', re.I)
+
+def _parse_http_request(payload: bytes) -> Optional[Tuple]:
+    """Split an HTTP request head into (method, path, host, user_agent, referer) bytes"""
+    request_line = _REQLINE_RE.match(payload)
+    if request_line is None:
+        return None
+    
+    # Only search the header block, not the request body
+    header_end = payload.find(b'\r\n\r\n')
+    if header_end < 0:
+        header_end = len(payload)
+    
+    headers = [pattern.search(payload, 0, header_end) for pattern in (_HOST_RE, _USER_AGENT_RE, _REFERER_RE)]
+    return (request_line.group(1), request_line.group(2),
+            *(match.group(1).rstrip() if match else None for match in headers))
+
+# Compiled parser from _pcap_parse.pyx, built on first import when Cython is installed
+try:
+    import pyximport
+    _importers = pyximport.install(language_level=3)
+    try:
+        from _pcap_parse import parse_http_request
+    finally:
+        pyximport.uninstall(*_importers)
+    CYTHON_PARSER_AVAILABLE = True
+except ImportError:
+    parse_http_request = _parse_http_request
+    CYTHON_PARSER_AVAILABLE = False
+
+@functools.lru_cache(maxsize=8192)
+def _decode(value: bytes) -> str:
+    """Decode header bytes, memoized since hosts and user agents repeat heavily"""
+    return value.decode('utf-8', 'replace')
+
+def _format_ip(address):
+    """Format a packed IPv4/IPv6 address; scapy already yields strings"""
+    if isinstance(address, bytes):
+        return socket.inet_ntop(socket.AF_INET if len(address) == 4 else socket.AF_INET6, address)
+    return address
+
+if DPKT_AVAILABLE:
+    # Link-layer decoders by pcap datalink type
+    LINK_DECODERS = {
+        dpkt.pcap.DLT_EN10MB: dpkt.ethernet.Ethernet,
+        dpkt.pcap.DLT_LINUX_SLL: dpkt.sll.SLL
+    }
+    # Offset of the EtherType field in each link-layer header
+    LINK_TYPE_OFFSETS = {
+        dpkt.pcap.DLT_EN10MB: 12,
+        dpkt.pcap.DLT_LINUX_SLL: 14
+    }
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Attack signatures matched against lowercased URLs; the index is the pattern id
+ATTACK_SIGNATURES = [
+    ('union select', 'sqli'), ("' or ", 'sqli'), ('or 1=1', 'sqli'), ('%27', 'sqli'),
+    ('sleep(', 'sqli'), ('information_schema', 'sqli'),
+    ('<script', 'xss'), ('%3cscript', 'xss'), ('javascript:', 'xss'),
+    ('onerror=', 'xss'), ('onload=', 'xss'), ('alert(', 'xss'),
+    ('../', 'path_traversal'), ('..\\', 'path_traversal'), ('%2e%2e', 'path_traversal'),
+    ('/etc/passwd', 'path_traversal'), ('/proc/self', 'path_traversal'),
+    (';cat ', 'command_injection'), ('|cat ', 'command_injection'), ('$(', 'command_injection'),
+    ('`', 'command_injection'), ('/bin/sh', 'command_injection'),
+    ('<!entity', 'xxe'), ('cmd.php', 'web_shell'), ('c99.php', 'web_shell'), ('r57.php', 'web_shell'),
+]
+
+if AHOCORASICK_AVAILABLE:
+    _SIGNATURE_AUTOMATON = ahocorasick.Automaton()
+    for pattern_id, (signature, _) in enumerate(ATTACK_SIGNATURES):
+        _SIGNATURE_AUTOMATON.add_word(signature, (pattern_id, len(signature)))
+    _SIGNATURE_AUTOMATON.make_automaton()
+
+def _match_order(match: Tuple[int, int]) -> Tuple[int, int]:
+    """Order matches by position, then pattern id"""
+    return match[1], match[0]
+
+def scan_urls(urls: List[str]) -> List[List[Tuple[int, int]]]:
+    """Match every URL against ATTACK_SIGNATURES, returning (pattern_id, position) per URL"""
+    lowered = [url.lower() for url in urls]
+    matches = [[] for _ in lowered]
+    
+    if AHOCORASICK_AVAILABLE:
+        # One automaton pass over all URLs, mapped back to the URL each match starts in
+        offsets = []
+        offset = 0
+        for url in lowered:
+            offsets.append(offset)
+            offset += len(url) + 1
+        
+        for end, (pattern_id, length) in _SIGNATURE_AUTOMATON.iter('\n'.join(lowered)):
+            start = end - length + 1
+            index = bisect.bisect_right(offsets, start) - 1
+            matches[index].append((pattern_id, start - offsets[index]))
+    else:
+        for index, url in enumerate(lowered):
+            for pattern_id, (signature, _) in enumerate(ATTACK_SIGNATURES):
+                position = url.find(signature)
+                while position >= 0:
+                    matches[index].append((pattern_id, position))
+                    position = url.find(signature, position + 1)
+    
+    return [sorted(url_matches, key=_match_order) if len(url_matches) > 1 else url_matches
+            for url_matches in matches]
+
+# Classic microsecond pcap magic, as read little-endian, mapped to the file's byte order
+PCAP_BYTE_ORDERS = {0xa1b2c3d4: '<', 0xd4c3b2a1: '>'}
+PCAP_FILE_HEADER_SIZE = 24
+PCAP_RECORD_HEADER_SIZE = 16
+
+# Record header (ts_sec, ts_usec, incl_len, orig_len), compiled once per byte order
+PCAP_RECORD_HEADERS = {endian: struct.Struct(endian + 'IIII') for endian in PCAP_BYTE_ORDERS.values()}
+
+# Column attributes of PCAPProcessor, in the order workers return them
+_COLUMNS = ('_urls', '_methods', '_hosts', '_paths', '_user_agents', '_referers',
+            '_src_ips', '_timestamps', '_protocols', '_src_ports', '_dst_ports', '_counts')
+
+# Resync limits: a record header found by scanning must not predate the previous split's
+# record by more than RESYNC_TS_WINDOW, must have a sane original length, and must chain
+# into further headers whose timestamps step forward by at most RESYNC_TS_WINDOW
+RESYNC_TS_WINDOW = 3600
+RESYNC_MAX_ORIG_LEN = 262144
+RESYNC_CHAIN = 3
+
+def _valid_record(buf, pos: int, end: int, endian: str, snaplen: int, min_ts: int, max_ts: int) -> bool:
+    """Check whether a plausible pcap record header starts at pos"""
+    if pos == end:
+        return True
+    if pos + PCAP_RECORD_HEADER_SIZE > end:
+        return False
+    ts_sec, ts_usec, incl_len, orig_len = PCAP_RECORD_HEADERS[endian].unpack_from(buf, pos)
+    return (min_ts <= ts_sec <= max_ts and ts_usec < 1000000
+            and incl_len <= snaplen and incl_len <= orig_len <= RESYNC_MAX_ORIG_LEN
+            and pos + PCAP_RECORD_HEADER_SIZE + incl_len <= end)
+
+def _find_record_start(buf, pos: int, endian: str, snaplen: int, anchor_ts: int) -> Optional[int]:
+    """Offset of the first record header at or after pos that chains RESYNC_CHAIN deep, or None"""
+    end = len(buf)
+    unpack_header = PCAP_RECORD_HEADERS[endian].unpack_from
+    # A real record boundary always lies within one maximal record of any offset
+    limit = min(end, pos + snaplen + PCAP_RECORD_HEADER_SIZE)
+    while pos <= limit:
+        record = pos
+        min_ts, max_ts = anchor_ts - RESYNC_TS_WINDOW, 0xFFFFFFFF
+        for _ in range(RESYNC_CHAIN):
+            if not _valid_record(buf, record, end, endian, snaplen, min_ts, max_ts):
+                break
+            if record == end:
+                return pos
+            ts_sec, _, incl_len, _ = unpack_header(buf, record)
+            min_ts, max_ts = ts_sec, ts_sec + RESYNC_TS_WINDOW
+            record += PCAP_RECORD_HEADER_SIZE + incl_len
+        else:
+            return pos
+        pos += 1
+    return None
+
+def _http_candidate(buf, pos: int, end: int, type_offset: int) -> bool:
+    """Check raw header bytes for TCP to an HTTP port; anything unclear is left to dpkt"""
+    net = pos + type_offset + 2
+    if net + 20 > end:
+        return True
+    
+    ethertype = buf[net - 2] << 8 | buf[net - 1]
+    if ethertype == 0x0800:
+        if buf[net + 9] != 6:
+            return False
+        tcp = net + (buf[net] & 0x0f) * 4
+    elif ethertype == 0x86dd and buf[net + 6] == 6:
+        tcp = net + 40
+    else:
+        return True
+    
+    if tcp + 4 > end:
+        return True
+    return (buf[tcp + 2] << 8 | buf[tcp + 3]) in HTTP_PORTS
+
+def _walk_records(processor, buf, start: int, end: int, endian: str, linktype: int):
+    """Feed the pcap records starting in [start, end) of a mapped file to processor"""
+    decode_link = LINK_DECODERS[linktype]
+    type_offset = LINK_TYPE_OFFSETS[linktype]
+    # Bound once so the loop does no format or attribute lookups per record
+    unpack_header = PCAP_RECORD_HEADERS[endian].unpack_from
+    process_packet = processor._process_raw_packet
+    
+    # Records are read in place; only HTTP candidates are copied out for dpkt
+    pos = start
+    records = 0
+    errors = 0
+    while pos + PCAP_RECORD_HEADER_SIZE <= end:
+        ts_sec, ts_usec, incl_len, _ = unpack_header(buf, pos)
+        pos += PCAP_RECORD_HEADER_SIZE
+        records += 1
+        stop = min(pos + incl_len, end)
+        if _http_candidate(buf, pos, stop, type_offset):
+            try:
+                process_packet(ts_sec + ts_usec / 1E6, buf[pos:stop], decode_link)
+            except dpkt.dpkt.UnpackError:
+                errors += 1
+        pos += incl_len
+    processor.processed_packets += records
+    processor.parse_errors += errors
+
+def _process_range(task: Tuple) -> Tuple:
+    """Worker: parse the pcap records starting in [start, end) and return the columns"""
+    pcap_path, start, end, endian, linktype, dedupe = task
+    processor = PCAPProcessor(dedupe=dedupe)
+    
+    with open(pcap_path, 'rb') as raw:
+        with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            _walk_records(processor, buf, start, end, endian, linktype)
+    
+    return (processor.processed_packets, processor.http_packets, processor.parse_errors,
+            tuple(getattr(processor, column) for column in _COLUMNS))
+
+class IoUringPcapReader(io.RawIOBase):
+    """Raw read-only file that keeps several block reads in flight through io_uring"""
+    BLOCK_SIZE = 1 << 20
+    DEPTH = 4
+    
+    def __init__(self, path: str):
+        super().__init__()
+        self.name = path
+        self._fd = os.open(path, os.O_RDONLY)
+        self._size = os.fstat(self._fd).st_size
+        self._ring = liburing.Ring()
+        self._cqe = liburing.Cqe()
+        try:
+            liburing.io_uring_queue_init(self.DEPTH, self._ring)
+        except Exception:
+            os.close(self._fd)
+            raise
+        
+        # Block n is always read into slot n % DEPTH
+        self._slots = [bytearray(self.BLOCK_SIZE) for _ in range(self.DEPTH)]
+        self._completed = {}
+        self._in_flight = 0
+        self._start(0)
+    
+    def _submit(self, block: int):
+        """Queue the read of one block into its slot, if it is inside the file"""
+        if block * self.BLOCK_SIZE >= self._size:
+            return
+        sqe = liburing.io_uring_get_sqe(self._ring)
+        liburing.io_uring_prep_read(sqe, self._fd, self._slots[block % self.DEPTH], block * self.BLOCK_SIZE)
+        liburing.io_uring_sqe_set_data64(sqe, block)
+        self._in_flight += 1
+    
+    def _reap(self):
+        """Wait for one completion and record its result"""
+        liburing.io_uring_wait_cqe(self._ring, self._cqe)
+        cqe = self._cqe[0]
+        self._completed[liburing.io_uring_cqe_get_data64(cqe)] = cqe.res
+        liburing.io_uring_cqe_seen(self._ring, cqe)
+        self._in_flight -= 1
+    
+    def _start(self, block: int):
+        """Drop outstanding reads and fill the ring starting at block"""
+        while self._in_flight:
+            self._reap()
+        self._completed.clear()
+        
+        for ahead in range(block, block + self.DEPTH):
+            self._submit(ahead)
+        liburing.io_uring_submit(self._ring)
+        
+        self._block = block
+        self._chunk = memoryview(b'')
+        self._chunk_offset = block * self.BLOCK_SIZE
+        self._pos = 0
+    
+    def _next_chunk(self) -> bool:
+        """Move to the next block once its read completes, recycling the consumed slot"""
+        if self._chunk:
+            self._submit(self._block - 1 + self.DEPTH)
+            liburing.io_uring_submit(self._ring)
+        
+        block = self._block
+        offset = block * self.BLOCK_SIZE
+        if offset >= self._size:
+            return False
+        
+        while block not in self._completed:
+            self._reap()
+        res = self._completed.pop(block)
+        if res < 0:
+            raise OSError(-res, os.strerror(-res), self.name)
+        if res < min(self.BLOCK_SIZE, self._size - offset):
+            raise OSError(f"Short read at offset {offset} of {self.name}")
+        
+        self._chunk = memoryview(self._slots[block % self.DEPTH])[:res]
+        self._chunk_offset = offset
+        self._pos = 0
+        self._block = block + 1
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._pos == len(self._chunk) and not self._next_chunk():
+            return 0
+        count = min(len(buffer), len(self._chunk) - self._pos)
+        buffer[:count] = self._chunk[self._pos:self._pos + count]
+        self._pos += count
+        return count
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._chunk_offset + self._pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+        elif whence == io.SEEK_END:
+            offset += self._size
+        
+        self._start(offset // self.BLOCK_SIZE)
+        if self._next_chunk():
+            self._pos = min(offset - self._chunk_offset, len(self._chunk))
+        return offset
+    
+    def fileno(self) -> int:
+        return self._fd
+    
+    def close(self):
+        if not self.closed:
+            while self._in_flight:
+                self._reap()
+            liburing.io_uring_queue_exit(self._ring)
+            os.close(self._fd)
+        super().close()
+
+def _summary(results: Dict) -> Dict:
+    """Results without the URL rows, written as the NDJSON trailer line"""
+    return {key: value for key, value in results.items() if key != 'extracted_urls'}
+
+def _dumps_line(obj) -> bytes:
+    """Serialize one NDJSON line"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj) + b'\n'
+    return json.dumps(obj, separators=(',', ':')).encode() + b'\n'
+
 class PCAPProcessor:
-    def __init__(self):
-        self.extracted_urls = []
+    # PCAP read buffer, well above the io default, to cut read() syscalls
+    BUFFER_SIZE = 1 << 20
+    # Files smaller than this are not worth the worker startup cost
+    PARALLEL_MIN_BYTES = 1 << 26
+    # Byte range handed to one worker task; bounds how much a task buffers
+    RANGE_BYTES = 1 << 26
+    # Rows buffered before they are written out when streaming to a file
+    FLUSH_N = 100000
+    # Rows kept in the returned result when streaming to a file
+    SAMPLE_SIZE = 5
+    
+    def __init__(self, workers: Optional[int] = None, dedupe: bool = True):
+        self.workers = workers or os.cpu_count() or 1
+        # Keep one row per distinct URL, with a count of how often it was seen
+        self.dedupe = dedupe
         self.processed_packets = 0
         self.http_packets = 0
+        # Packets skipped because they failed to parse; only the total is reported
+        self.parse_errors = 0
+        # Set when packets are filtered before counting, so total_packets only covers matches
+        self.packet_filter = None
         
-    def process_pcap_file(self, pcap_path: str) -> Dict:
-        """Process a PCAP file and extract HTTP URLs"""
-        if not SCAPY_AVAILABLE:
+        # Streaming output: rows are flushed here every FLUSH_N and the columns reset
+        self._out = None
+        self._rows_written = 0
+        self._sample = []
+        self._reset_columns()
+    
+    def _reset_columns(self):
+        """Start empty columns; dicts and ISO timestamps are only built on output"""
+        self._seen = {}
+        self._urls = []
+        self._methods = []
+        self._hosts = []
+        self._paths = []
+        self._user_agents = []
+        self._referers = []
+        self._src_ips = []
+        self._timestamps = array.array('d')
+        self._protocols = array.array('B')
+        self._src_ports = array.array('H')
+        self._dst_ports = array.array('H')
+        self._counts = array.array('Q')
+    
+    def process_pcap_file(self, pcap_path: str, output_path: Optional[str] = None) -> Dict:
+        """Process a PCAP file and extract HTTP URLs, streaming them to output_path if given"""
+        if not DPKT_AVAILABLE and not SCAPY_AVAILABLE:
             return self._mock_pcap_processing(pcap_path)
         
         try:
             logger.info(f"Processing PCAP file: {pcap_path}")
             start_time = datetime.now()
+            if output_path:
+                self._out = open(output_path, 'wb')
             
-            # Read PCAP file
-            packets = scapy.rdpcap(pcap_path)
-            self.processed_packets = len(packets)
+            # Classic pcaps are walked in place, split across worker processes when large
+            if DPKT_AVAILABLE and self._is_classic_pcap(pcap_path):
+                if self.workers > 1 and os.path.getsize(pcap_path) >= self.PARALLEL_MIN_BYTES:
+                    self._read_parallel(pcap_path)
+                else:
+                    self._read_mapped(pcap_path)
+            else:
+                self._read_sequential(pcap_path)
             
-            logger.info(f"Loaded {self.processed_packets} packets")
+            logger.info(f"Processed {self.processed_packets} packets")
+            if self.parse_errors:
+                logger.info(f"Skipped {self.parse_errors} packets that failed to parse")
             
-            # Process each packet
-            for packet in packets:
-                self._process_packet(packet)
+            if self._out is not None:
+                self._flush()
+                extracted_urls = self._sample
+                url_count = self._rows_written
+            else:
+                extracted_urls = self.get_extracted_urls()
+                url_count = len(extracted_urls)
             
             processing_time = (datetime.now() - start_time).total_seconds()
             
@@ -57,12 +511,20 @@ class PCAPProcessor:
                 'pcap_file': pcap_path,
                 'total_packets': self.processed_packets,
                 'http_packets': self.http_packets,
-                'extracted_urls': self.extracted_urls,
+                'parse_errors': self.parse_errors,
+                'packet_filter': self.packet_filter,
+                'url_count': url_count,
+                'extracted_urls': extracted_urls,
                 'processing_time_seconds': processing_time,
                 'timestamp': datetime.now().isoformat()
             }
             
-            logger.info(f"Extracted {len(self.extracted_urls)} URLs from {self.http_packets} HTTP packets")
+            if self._out is not None:
+                # Summary goes last, once the totals are known
+                self._out.write(_dumps_line(_summary(result)))
+                result['output_file'] = output_path
+            
+            logger.info(f"Extracted {url_count} URLs from {self.http_packets} HTTP packets")
             
             return result
             
@@ -73,65 +535,284 @@ class PCAPProcessor:
                 'pcap_file': pcap_path,
                 'timestamp': datetime.now().isoformat()
             }
+        finally:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+    
+    def _read_sequential(self, pcap_path: str):
+        """Parse the whole capture in this process"""
+        with self._open_capture(pcap_path) as raw:
+            if DPKT_AVAILABLE:
+                self._read_with_dpkt(raw)
+            else:
+                self._read_with_scapy(raw)
+    
+    def _open_capture(self, pcap_path: str):
+        """Open the capture with io_uring read-ahead, or through a large read buffer"""
+        if LIBURING_AVAILABLE:
+            try:
+                return io.BufferedReader(IoUringPcapReader(pcap_path), self.BUFFER_SIZE)
+            except OSError as e:
+                logger.debug(f"io_uring unavailable, using buffered reads: {e}")
+        
+        raw = open(pcap_path, 'rb', buffering=self.BUFFER_SIZE)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(raw.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return raw
+    
+    def _is_classic_pcap(self, pcap_path: str) -> bool:
+        """Whether the file is a classic microsecond pcap with a dpkt-supported link type"""
+        with open(pcap_path, 'rb') as raw:
+            header = raw.read(PCAP_FILE_HEADER_SIZE)
+        if len(header) < PCAP_FILE_HEADER_SIZE:
+            return False
+        endian = PCAP_BYTE_ORDERS.get(struct.unpack_from('<I', header)[0])
+        if endian is None:
+            return False
+        return struct.unpack_from(endian + 'I', header, 20)[0] in LINK_DECODERS
+    
+    def _read_mapped(self, pcap_path: str):
+        """Walk the records of a classic pcap through mmap in this process"""
+        with open(pcap_path, 'rb') as raw:
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    buf.madvise(mmap.MADV_SEQUENTIAL)
+                    buf.madvise(mmap.MADV_WILLNEED)
+                
+                endian = PCAP_BYTE_ORDERS[struct.unpack_from('<I', buf)[0]]
+                linktype = struct.unpack_from(endian + 'I', buf, 20)[0]
+                _walk_records(self, buf, PCAP_FILE_HEADER_SIZE, len(buf), endian, linktype)
+    
+    def _read_parallel(self, pcap_path: str):
+        """Parse disjoint byte ranges of the capture in worker processes"""
+        with open(pcap_path, 'rb') as raw:
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                endian = PCAP_BYTE_ORDERS[struct.unpack_from('<I', buf)[0]]
+                snaplen, linktype = struct.unpack_from(endian + 'II', buf, 16)
+                
+                # Resync each split point to the next valid record header
+                size = len(buf)
+                if size < PCAP_FILE_HEADER_SIZE + PCAP_RECORD_HEADER_SIZE:
+                    return self._read_mapped(pcap_path)
+                unpack_header = PCAP_RECORD_HEADERS[endian].unpack_from
+                ranges = max(self.workers, -(-(size - PCAP_FILE_HEADER_SIZE) // self.RANGE_BYTES))
+                step = (size - PCAP_FILE_HEADER_SIZE) // ranges
+                bounds = [PCAP_FILE_HEADER_SIZE]
+                for i in range(1, ranges):
+                    split = max(bounds[-1], PCAP_FILE_HEADER_SIZE + i * step)
+                    # Anchor timestamps to the last accepted boundary so long captures still split
+                    start = _find_record_start(buf, split, endian, snaplen, unpack_header(buf, bounds[-1])[0])
+                    if start is None:
+                        # Leave this split to the previous range rather than guess
+                        continue
+                    if start >= size:
+                        break
+                    if start > bounds[-1]:
+                        bounds.append(start)
+                bounds.append(size)
+        
+        tasks = [(pcap_path, start, end, endian, linktype, self.dedupe)
+                 for start, end in zip(bounds, bounds[1:]) if start < end]
+        context = multiprocessing.get_context(POOL_START_METHOD)
+        # Ranges are consumed in file order as they finish, so only a few are held at once
+        with context.Pool(min(self.workers, len(tasks))) as pool:
+            for processed_packets, http_packets, parse_errors, columns in pool.imap(_process_range, tasks):
+                self.processed_packets += processed_packets
+                self.http_packets += http_packets
+                self.parse_errors += parse_errors
+                # Re-append row by row so duplicates across ranges are merged
+                for row in zip(*columns):
+                    self._append_request(*row)
+    
+    def _read_with_dpkt(self, raw):
+        """Parse packets from raw bytes with dpkt"""
+        reader = dpkt.pcap.UniversalReader(raw)
+        decode_link = LINK_DECODERS.get(reader.datalink())
+        
+        if decode_link is None:
+            if not SCAPY_AVAILABLE:
+                raise ValueError(f"Unsupported datalink type: {reader.datalink()}")
+            # Let scapy handle link types dpkt is not set up for
+            raw.seek(0)
+            self._read_with_scapy(raw)
+            return
+        
+        # Skip dpkt decoding for packets the raw header shows are not HTTP requests
+        type_offset = LINK_TYPE_OFFSETS[reader.datalink()]
+        for ts, buf in reader:
+            self.processed_packets += 1
+            if _http_candidate(buf, 0, len(buf), type_offset):
+                try:
+                    self._process_raw_packet(ts, buf, decode_link)
+                except dpkt.dpkt.UnpackError:
+                    self.parse_errors += 1
+    
+    def _read_with_scapy(self, raw):
+        """Parse packets with scapy's layer dissection"""
+        if shutil.which(scapy.conf.prog.tcpdump):
+            # tcpdump's compiled BPF drops non-HTTP packets before scapy dissects them
+            self.packet_filter = BPF_FILTER
+            scapy.sniff(offline=raw, filter=BPF_FILTER, prn=self._process_packet_counted, store=False)
+            return
+        
+        with scapy.PcapReader(raw) as reader:
+            for packet in reader:
+                self._process_packet_counted(packet)
+    
+    def _process_raw_packet(self, ts: float, buf: bytes, decode_link):
+        """Extract an HTTP request from raw packet bytes; dpkt.UnpackError is left to the caller"""
+        ip = decode_link(buf).data
+        if not isinstance(ip, (dpkt.ip.IP, dpkt.ip6.IP6)):
+            return
+        
+        tcp = ip.data
+        if not isinstance(tcp, dpkt.tcp.TCP) or tcp.dport not in HTTP_PORTS:
+            return
+        
+        request = parse_http_request(tcp.data)
+        if request is None:
+            return
+        
+        self.http_packets += 1
+        
+        # Fields stay as bytes until output; the address is formatted there too
+        method, path, host, user_agent, referer = request
+        if host is None:
+            host = b''
+        
+        # Construct full URL
+        protocol = _PROTO.get(tcp.dport, 0)
+        url = _URL_PREFIXES[protocol] + host + path
+        
+        self._append_request(
+            url, method, host, path, user_agent, referer,
+            ip.src, ts, protocol, tcp.sport, tcp.dport
+        )
     
     def _process_packet(self, packet):
         """Process individual packet to extract HTTP information"""
+        self.processed_packets += 1
+        # Check if packet has HTTP layer
+        http_layer = packet.getlayer(HTTPRequest)
+        if http_layer is not None:
+            self.http_packets += 1
+            self._extract_http_request(packet, http_layer)
+    
+    def _process_packet_counted(self, packet):
+        """Process one scapy packet, counting parse failures instead of raising them"""
         try:
-            # Check if packet has HTTP layer
-            if packet.haslayer(HTTPRequest):
-                self.http_packets += 1
-                self._extract_http_request(packet)
-                
-        except Exception as e:
-            logger.debug(f"Error processing packet: {e}")
+            self._process_packet(packet)
+        except Exception:
+            self.parse_errors += 1
     
-    def _extract_http_request(self, packet):
+    def _extract_http_request(self, packet, http_layer):
         """Extract HTTP request information"""
-        try:
-            http_layer = packet[HTTPRequest]
-            ip_layer = packet[IP] if packet.haslayer(IP) else None
-            
-            # Extract basic information
-            method = http_layer.Method.decode('utf-8') if http_layer.Method else 'GET'
-            host = http_layer.Host.decode('utf-8') if http_layer.Host else ''
-            path = http_layer.Path.decode('utf-8') if http_layer.Path else '/'
-            
-            # Construct full URL
-            protocol = 'https' if packet.haslayer(TCP) and packet[TCP].dport == 443 else 'http'
-            url = f"{protocol}://{host}{path}"
-            
-            # Extract headers
+        # Look each layer up once; every lookup walks the layer chain
+        ip_layer = packet.getlayer(IP)
+        tcp_layer = packet.getlayer(TCP)
+        
+        # Extract basic information, kept as bytes until output
+        method = http_layer.Method or b'GET'
+        host = http_layer.Host or b''
+        path = http_layer.Path or b'/'
+        
+        # Construct full URL
+        sport, dport = (tcp_layer.sport, tcp_layer.dport) if tcp_layer is not None else (0, 0)
+        protocol = _PROTO.get(dport, 0)
+        url = _URL_PREFIXES[protocol] + host + path
+        
+        # Extract headers
+        user_agent = getattr(http_layer, 'User_Agent', None) or None
+        referer = getattr(http_layer, 'Referer', None) or None
+        
+        # Extract source IP
+        source_ip = ip_layer.src if ip_layer is not None else None
+        
+        self._append_request(
+            url, method, host, path, user_agent, referer,
+            source_ip, float(packet.time), protocol, sport, dport
+        )
+    
+    def _append_request(self, url, method, host, path, user_agent, referer,
+                        source_ip, timestamp, protocol, src_port, dst_port, count=1):
+        """Append one extracted request to the column store"""
+        if self.dedupe:
+            key = xxhash.xxh3_64_intdigest(url) if XXHASH_AVAILABLE else url
+            index = self._seen.get(key)
+            if index is not None:
+                self._counts[index] += count
+                return
+            self._seen[key] = len(self._urls)
+        
+        self._urls.append(url)
+        self._methods.append(method)
+        self._hosts.append(host)
+        self._paths.append(path)
+        self._user_agents.append(user_agent)
+        self._referers.append(referer)
+        self._src_ips.append(source_ip)
+        self._timestamps.append(timestamp)
+        self._protocols.append(protocol)
+        self._src_ports.append(src_port)
+        self._dst_ports.append(dst_port)
+        self._counts.append(count)
+        
+        if self._out is not None and len(self._urls) >= self.FLUSH_N:
+            self._flush()
+    
+    def _flush(self):
+        """Write the buffered rows as NDJSON and reset the columns"""
+        for row in self._iter_url_dicts():
+            if len(self._sample) < self.SAMPLE_SIZE:
+                self._sample.append(row)
+            self._out.write(_dumps_line(row))
+        self._rows_written += len(self._urls)
+        self._reset_columns()
+    
+    def _iter_url_dicts(self):
+        """Yield extracted requests as dicts, built lazily from the columns"""
+        detections_column = scan_urls([url.decode('utf-8', 'replace') for url in self._urls])
+        
+        for (url, method, host, path, user_agent, referer, source_ip,
+             timestamp, protocol, src_port, dst_port, count, detections) in zip(
+                self._urls, self._methods, self._hosts, self._paths,
+                self._user_agents, self._referers, self._src_ips, self._timestamps,
+                self._protocols, self._src_ports, self._dst_ports, self._counts,
+                detections_column):
             headers = {}
-            if hasattr(http_layer, 'User_Agent') and http_layer.User_Agent:
-                headers['User-Agent'] = http_layer.User_Agent.decode('utf-8')
-            if hasattr(http_layer, 'Referer') and http_layer.Referer:
-                headers['Referer'] = http_layer.Referer.decode('utf-8')
-            
-            # Extract source IP
-            source_ip = ip_layer.src if ip_layer else None
-            
-            # Get timestamp
-            timestamp = datetime.fromtimestamp(float(packet.time)).isoformat()
+            if user_agent:
+                headers['User-Agent'] = _decode(user_agent)
+            if referer:
+                headers['Referer'] = _decode(referer)
             
-            url_info = {
-                'url': url,
-                'method': method,
-                'host': host,
-                'path': path,
+            yield {
+                'url': url.decode('utf-8', 'replace'),
+                'method': _decode(method),
+                'host': _decode(host),
+                'path': path.decode('utf-8', 'replace'),
                 'headers': headers,
-                'source_ip': source_ip,
-                'timestamp': timestamp,
+                'source_ip': _format_ip(source_ip),
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
                 'packet_info': {
-                    'protocol': protocol,
-                    'src_port': packet[TCP].sport if packet.haslayer(TCP) else None,
-                    'dst_port': packet[TCP].dport if packet.haslayer(TCP) else None
-                }
+                    'protocol': PROTOCOLS[protocol],
+                    'src_port': src_port or None,
+                    'dst_port': dst_port or None
+                },
+                'count': count,
+                'detections': [
+                    {
+                        'signature': ATTACK_SIGNATURES[pattern_id][0],
+                        'attack_type': ATTACK_SIGNATURES[pattern_id][1],
+                        'position': position
+                    }
+                    for pattern_id, position in detections
+                ]
             }
-            
-            self.extracted_urls.append(url_info)
-            
-        except Exception as e:
-            logger.debug(f"Error extracting HTTP request: {e}")
+    
+    def get_extracted_urls(self) -> List[Dict]:
+        """Extracted requests as a list of dicts"""
+        return list(self._iter_url_dicts())
     
     def _mock_pcap_processing(self, pcap_path: str) -> Dict:
         """Mock PCAP processing when Scapy is not available"""
@@ -175,48 +856,51 @@ class PCAPProcessor:
             'pcap_file': pcap_path,
             'total_packets': 1500,
             'http_packets': 45,
+            'url_count': len(mock_urls),
             'extracted_urls': mock_urls,
             'processing_time_seconds': 2.5,
             'timestamp': datetime.now().isoformat(),
-            'note': 'Mock data - install Scapy for real PCAP processing'
+            'note': 'Mock data - install dpkt or Scapy for real PCAP processing'
         }
     
     def save_results(self, results: Dict, output_path: str):
-        """Save processing results to JSON file"""
+        """Save processing results as NDJSON (one line per URL, then a summary line)"""
         try:
-            with open(output_path, 'w') as f:
-                json.dump(results, f, indent=2)
+            if output_path.endswith('.json'):
+                with open(output_path, 'w') as f:
+                    json.dump(results, f, indent=2)
+            else:
+                rows = self._iter_url_dicts() if self._urls else results.get('extracted_urls', [])
+                
+                with open(output_path, 'wb') as f:
+                    for row in rows:
+                        f.write(_dumps_line(row))
+                    f.write(_dumps_line(_summary(results)))
             logger.info(f"Results saved to {output_path}")
         except Exception as e:
             logger.error(f"Error saving results: {e}")
 
-def main():
-    """Main PCAP processing function"""
-    if len(sys.argv) < 2:
-        print("Usage: python pcap_processor.py <pcap_file_path>")
-        sys.exit(1)
+def _process_one(pcap_path: str, workers: int) -> Dict:
+    """Process one capture, streaming its rows next to it as *_results.ndjson"""
+    # Rows are streamed to the output file while the capture is read
+    output_path = os.path.splitext(pcap_path)[0] + '_results.ndjson'
+    processor = PCAPProcessor(workers=workers)
+    results = processor.process_pcap_file(pcap_path, output_path)
     
-    pcap_path = sys.argv[1]
-    
-    if not os.path.exists(pcap_path):
-        print(f"Error: PCAP file not found: {pcap_path}")
-        sys.exit(1)
-    
-    processor = PCAPProcessor()
-    results = processor.process_pcap_file(pcap_path)
-    
-    # Print results
+    # Mock results are not streamed, so save them here
+    if 'error' not in results and 'output_file' not in results:
+        processor.save_results(results, output_path)
+    return results
+
+def _print_summary(results: Dict):
+    """Print the outcome of one processed capture"""
     if 'error' not in results:
-        print(f"Successfully processed PCAP file:")
+        print(f"Successfully processed PCAP file: {results['pcap_file']}")
         print(f"  Total packets: {results['total_packets']}")
         print(f"  HTTP packets: {results['http_packets']}")
-        print(f"  Extracted URLs: {len(results['extracted_urls'])}")
+        print(f"  Extracted URLs: {results['url_count']}")
         print(f"  Processing time: {results['processing_time_seconds']:.2f}s")
         
-        # Save results
-        output_path = pcap_path.replace('.pcap', '_results.json').replace('.pcapng', '_results.json')
-        processor.save_results(results, output_path)
-        
         # Print first few URLs
         if results['extracted_urls']:
             print("\nFirst few extracted URLs:")
@@ -225,5 +909,31 @@ def main():
     else:
         print(f"Error processing PCAP file: {results['error']}")
 
+async def _amain(pcap_paths: List[str]):
+    """Process several captures concurrently so one file's reads overlap another's parsing"""
+    # Share the worker processes used for large files between the captures
+    workers = max(1, (os.cpu_count() or 1) // len(pcap_paths))
+    all_results = await asyncio.gather(
+        *(asyncio.to_thread(_process_one, pcap_path, workers) for pcap_path in pcap_paths)
+    )
+    
+    for results in all_results:
+        _print_summary(results)
+
+def main():
+    """Main PCAP processing function"""
+    if len(sys.argv) < 2:
+        print("Usage: python pcap_processor.py <pcap_file_path> [<pcap_file_path> ...]")
+        sys.exit(1)
+    
+    pcap_paths = sys.argv[1:]
+    
+    for pcap_path in pcap_paths:
+        if not os.path.exists(pcap_path):
+            print(f"Error: PCAP file not found: {pcap_path}")
+            sys.exit(1)
+    
+    asyncio.run(_amain(pcap_paths))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Regression tests for thread safety of the ML inference predictor
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from ml_inference import CyberAttackPredictor
+
+FEATURE_COLUMNS = ['url_length', 'domain_length', 'path_length', 'query_length', 'special_char_count',
+                   'digit_count', 'path_depth', 'subdomain_count', 'parameter_count', 'encoded_chars_count',
+                   'frequency_score', 'suspicious_keyword_count', 'entropy']
+ATTACK_TYPES = ['normal', 'sql_injection', 'xss', 'path_traversal']
+
+def _load_small_models(self):
+    """Fit a small model on random features in place of the trained files"""
+    rng = np.random.default_rng(0)
+    X = rng.random((400, len(FEATURE_COLUMNS))) * 100
+    y = rng.choice(ATTACK_TYPES, size=400)
+    
+    self.metadata = {'feature_columns': FEATURE_COLUMNS, 'attack_types': ATTACK_TYPES, 'model_types': ['ensemble']}
+    self.feature_columns = FEATURE_COLUMNS
+    self.attack_types = ATTACK_TYPES
+    self.label_encoder = LabelEncoder().fit(y)
+    self._class_names = [str(name) for name in self.label_encoder.classes_]
+    self.scaler = StandardScaler().fit(X)
+    self.models = {'ensemble': LogisticRegression(max_iter=500).fit(self.scaler.transform(X),
+                                                                     self.label_encoder.transform(y))}
+
+@pytest.fixture
+def predictor(monkeypatch):
+    monkeypatch.setattr(CyberAttackPredictor, 'load_models', _load_small_models)
+    return CyberAttackPredictor()
+
+def test_concurrent_predictions_match_sequential(predictor):
+    urls = [f"http://h{i % 13}.example/{'a/' * (i % 9)}p{i}?id={i * 7919}&q={'%27' * (i % 5)}" for i in range(4000)]
+    expected = [predictor._predict_uncached(url, 'ensemble') for url in urls]
+    
+    # Switch threads often so any shared state between calls is overwritten
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda url: predictor._predict_uncached(url, 'ensemble'), urls))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    
+    assert results == expected
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the PCAP processor's parallel byte-range splitting
+"""
+
+import random
+
+import pytest
+
+dpkt = pytest.importorskip("dpkt")
+
+import pcap_processor
+from pcap_processor import PCAPProcessor
+
+def _write_capture(path, packets=3000, seed=7, gap=0.01):
+    """Write an Ethernet capture mixing HTTP requests with other TCP traffic"""
+    rng = random.Random(seed)
+    ts = 1700000000.0
+    
+    with open(path, 'wb') as f:
+        writer = dpkt.pcap.Writer(f, snaplen=65535)
+        for i in range(packets):
+            ts += rng.random() * gap
+            if rng.random() < 0.5:
+                payload = (f"GET /p{i}?q={rng.randint(0, 9)} HTTP/1.1\r\n"
+                           f"Host: h{i % 7}.example\r\nUser-Agent: ua\r\n\r\n").encode()
+                tcp = dpkt.tcp.TCP(sport=40000 + i % 1000, dport=80, data=payload)
+            else:
+                tcp = dpkt.tcp.TCP(sport=443, dport=50000, data=bytes(rng.randint(0, 1200)))
+            
+            ip = dpkt.ip.IP(src=bytes([10, 0, 0, i % 250 + 1]), dst=b'\x0a\x00\x01\x01', p=6, data=tcp)
+            ip.len += len(tcp)
+            eth = dpkt.ethernet.Ethernet(src=b'\x02' * 6, dst=b'\x04' * 6, data=ip)
+            writer.writepkt(bytes(eth), ts=ts)
+
+# Mean gaps giving a capture of about 15 seconds and one of about four days
+@pytest.fixture(params=[0.01, 240.0], ids=['seconds', 'days'])
+def capture(tmp_path, request):
+    path = str(tmp_path / 'capture.pcap')
+    _write_capture(path, gap=request.param)
+    return path
+
+@pytest.mark.parametrize('range_bytes', [1 << 12, 5000, 1 << 14])
+def test_parallel_matches_mapped_with_small_ranges(capture, range_bytes):
+    sequential = PCAPProcessor(workers=1, dedupe=False)
+    expected = sequential.process_pcap_file(capture)
+    
+    parallel = PCAPProcessor(workers=4, dedupe=False)
+    parallel.PARALLEL_MIN_BYTES = 0
+    parallel.RANGE_BYTES = range_bytes
+    result = parallel.process_pcap_file(capture)
+    
+    assert 'error' not in result
+    assert result['total_packets'] == expected['total_packets']
+    assert result['http_packets'] == expected['http_packets']
+    assert result['extracted_urls'] == expected['extracted_urls']
+
+def test_resync_only_lands_on_record_starts(capture):
+    with open(capture, 'rb') as f:
+        buf = f.read()
+    
+    header = pcap_processor.PCAP_RECORD_HEADERS['<']
+    starts = {len(buf)}
+    pos = pcap_processor.PCAP_FILE_HEADER_SIZE
+    while pos < len(buf):
+        starts.add(pos)
+        pos += pcap_processor.PCAP_RECORD_HEADER_SIZE + header.unpack_from(buf, pos)[2]
+    first_ts = header.unpack_from(buf, pcap_processor.PCAP_FILE_HEADER_SIZE)[0]
+    
+    for offset in range(pcap_processor.PCAP_FILE_HEADER_SIZE, len(buf), 3):
+        assert pcap_processor._find_record_start(buf, offset, '<', 65535, first_ts) in starts
+
+def test_resync_scan_is_bounded_by_snaplen():
+    buf = bytes(pcap_processor.PCAP_FILE_HEADER_SIZE) + bytes(range(256)) * 4096
+    assert pcap_processor._find_record_start(buf, pcap_processor.PCAP_FILE_HEADER_SIZE, '<', 1500, 1700000000) is None